@@ -1,17 +1,28 @@
 import asyncio
-import aiohttp
 import os
+import sys
 from urllib.parse import urljoin, urlparse, parse_qs, urlencode
 import re
 from datetime import datetime
-import json
 import csv
 from pathlib import Path
-import hashlib
 import time
-from collections import defaultdict
+from collections import Counter, defaultdict, namedtuple
+from contextlib import contextmanager
+from dataclasses import dataclass
+from functools import lru_cache
+from operator import attrgetter
 import logging
 
+try:
+    import aiohttp
+    import orjson
+    import xxhash
+    from aiolimiter import AsyncLimiter
+    from selectolax.lexbor import LexborHTMLParser
+except ImportError as e:
+    sys.exit(f"Missing dependency {e.name!r}; install them with: pip install -r requirements.txt")
+
 # Configure logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
@@ -23,6 +34,16 @@ MAX_PAGES = 1200
 MAX_PAGINATION_PAGES = 10
 OUTPUT_DIR = "/data/site_audit"
 IGNORE_ROBOTS = True
+# Files written to OUTPUT_DIR
+OUTPUT_FILES = (
+    "urls.csv", "seo.csv", "structured_data.jsonl", "content.jsonl", "media.csv",
+    "forms.csv", "forms.jsonl", "integrations.jsonl", "api_endpoints.jsonl",
+    "redirects.csv", "errors.csv", "hreflang_map.jsonl", "sitemaps.txt"
+)
+# Write the JSONL outputs zstd-compressed as <name>.jsonl.zst (needs zstandard)
+COMPRESS_JSONL = False
+# Write buffer for the large outputs, so they flush in few big writes
+LARGE_WRITE_BUFFER = 1 << 20
 
 # Create output directory
 Path(OUTPUT_DIR).mkdir(parents=True, exist_ok=True)
@@ -48,11 +69,8 @@ ALLOW_PATTERNS = [
 DENY_PATTERNS = [
     r"^/(ru|kk)(/|$)",
     r"lang=(?!en)",
-    r"/login",
-    r"/admin",
-    r"/user",
-    r"/basket",
-    r"/cart",
+    # Whole path segments only, so /en/.../administration stays allowed
+    r"/(login|admin|user|basket|cart)(/|$)",
     r"^/en/search",
     r"\?s=",
     r"\?search=",
@@ -62,32 +80,90 @@ DENY_PATTERNS = [
 # Tracking parameters to remove
 TRACKING_PARAMS = ["utm_*", "fbclid", "gclid", "mc_cid", "mc_eid"]
 
+# Tracking parameters split into exact names and "prefix_*" wildcards
+TRACKING_EXACT = frozenset(p for p in TRACKING_PARAMS if not p.endswith("*"))
+TRACKING_PREFIXES = tuple(p[:-1] for p in TRACKING_PARAMS if p.endswith("*"))
+
 # Stable parameters to keep
-STABLE_PARAMS = ["page", "q", "category", "tag", "date"]
+STABLE_PARAMS = frozenset(["page", "q", "category", "tag", "date"])
+
+# Precompiled patterns
+# Each list is folded into a single alternation so a URL is checked in one call
+ALLOW_RE = re.compile("|".join(f"(?:{p})" for p in ALLOW_PATTERNS))
+DENY_RE = re.compile("|".join(f"(?:{p})" for p in DENY_PATTERNS))
+
+# Charset declared in the page itself: <meta charset=...> or the http-equiv
+# Content-Type form. Browsers only look for it in the first 1024 bytes
+META_CHARSET_RE = re.compile(rb'<meta[^>]*?charset\s*=\s*["\']?\s*([\w.:-]+)', re.I)
+META_CHARSET_SCAN_BYTES = 1024
+
+JSONLD_RE = re.compile(r'<script[^>]*type=[\'"]application/ld\+json[\'"][^>]*>(.*?)</script>', re.DOTALL)
+# <meta> name/property values collected into seo.csv
+SEO_META_KEYS = frozenset(["description", "robots", "og:title", "og:description", "og:image", "twitter:card"])
+
+# Third-party integrations, one named group per tool. The branches sit in a
+# zero-width lookahead so finditer tries every position: a long gtag/fbq match
+# can't swallow the start of another tool's token
+INTEGRATION_RE = re.compile(
+    r'(?='
+    r'gtag\([^)]*\'(?P<ga4>G-[A-Z0-9]+)\''
+    r'|(?P<gtm>GTM-[A-Z0-9]+)'
+    r'|(?P<pixel>fbq\([^)]*\'track\'[^)]*\'[A-Z0-9]+\')'
+    r'|(?P<hotjar>hj\([^)]*\'[0-9]+\')'
+    r'|(?P<intercom>(?i:intercom))'
+    r'|(?P<maps>maps\.googleapis\.com)'
+    r'|(?P<recaptcha>(?i:recaptcha))'
+    r')'
+)
+
+# Prefilters on the raw page bytes. They are case-insensitive like the HTML
+# parser, so skipping an extractor never drops output it would have produced
+INTEGRATION_PREFILTER_RE = re.compile(rb'gtag\(|GTM-|fbq\(|hj\(|intercom|maps\.googleapis\.com|recaptcha', re.I)
+# Tags extract_media_data looks for
+MEDIA_PREFILTER_RE = re.compile(rb'<(?:img|video|audio)\b', re.I)
+FORM_PREFILTER_RE = re.compile(rb'<form\b', re.I)
+
+# (group, tool, loaded_from) for integrations that carry no extractable id
+DETECTED_INTEGRATIONS = (
+    ("pixel", "Meta Pixel", "https://connect.facebook.net"),
+    ("hotjar", "Hotjar", "https://static.hotjar.com"),
+    ("intercom", "Intercom", "https://widget.intercom.io"),
+    ("maps", "Google Maps", "https://maps.googleapis.com"),
+    ("recaptcha", "reCAPTCHA", "https://www.google.com/recaptcha"),
+)
+
+# Simple patterns for API endpoints in JS
+# This is a basic implementation - in a real crawler, you'd want to parse JS properly
+API_RE = re.compile(
+    r'(?P<url>https?://[^\'"\s]*(?:api[^\'"\s]*|\.json))'
+    r'|fetch\([\'"](?P<fetch>[^\'"]*)[\'"]\)'
+    r'|axios\.get\([\'"](?P<axios>[^\'"]*)[\'"]\)'
+)
+
+PAGINATION_HREF_RE = re.compile(r'(\?page=|/page/)\d+')
 
-# Initialize data storage
+# Initialize data storage; per-page records are streamed to OUTPUT_DIR
+# through Writers, only the crawl index stays in memory
 visited_urls = set()
-url_content_hashes = {}
-redirect_map = []
-error_log = []
-api_endpoints = []
-integrations = []
-forms_data = []
-content_data = []
-structured_data_entries = []
-seo_data = []
-media_data = []
+url_content_hashes = {}  # 16-byte xxh3 digest -> first URL with that body
 url_inventory = []
-hreflang_map = []
+url_type_counts = Counter()  # kept in step with url_inventory for the summary
 sitemaps_found = []
 
 # Rate limiting
-CONCURRENT_REQUESTS = 3
-REQUEST_DELAY = 0.5  # seconds
+MAX_CONNECTIONS = 64
+CONCURRENT_REQUESTS = 8  # per host, enforced by the connection pool
+REQUESTS_PER_SECOND = 10
 
-# Semaphore for limiting concurrent requests
-semaphore = asyncio.Semaphore(CONCURRENT_REQUESTS)
+# Token bucket shared by all workers; allows short bursts while holding the
+# average rate, without serializing a fixed delay into every request
+rate_limiter = AsyncLimiter(REQUESTS_PER_SECOND, 1)
 
+# Number of crawl workers pulling from the URL queue
+WORKERS = 16
+
+# Both URL helpers are pure and see the same nav/footer links on every page
+@lru_cache(maxsize=50000)
 def normalize_url(url, base_url=BASE_URL):
     """Normalize URL by removing tracking parameters and ensuring consistent format"""
     parsed = urlparse(url)
@@ -98,7 +174,7 @@ def normalize_url(url, base_url=BASE_URL):
     
     for key, value in query_params.items():
         # Check if parameter is a tracking parameter
-        is_tracking = any(re.match(param.replace("*", ".*"), key) for param in TRACKING_PARAMS)
+        is_tracking = key in TRACKING_EXACT or key.startswith(TRACKING_PREFIXES)
         if not is_tracking:
             # Keep stable parameters or those with limited values
             if key in STABLE_PARAMS or len(set(value)) <= 5:
@@ -111,6 +187,7 @@ def normalize_url(url, base_url=BASE_URL):
     normalized = parsed._replace(query=normalized_query, fragment="")
     return normalized.geturl()
 
+@lru_cache(maxsize=50000)
 def is_allowed_url(url):
     """Check if URL matches allowed patterns and doesn't match deny patterns"""
     path = urlparse(url).path
@@ -120,16 +197,11 @@ def is_allowed_url(url):
         return False
     
     # Check deny patterns first
-    for pattern in DENY_PATTERNS:
-        if re.match(pattern, url) or re.match(pattern, path):
-            return False
+    if DENY_RE.search(url) or DENY_RE.search(path):
+        return False
     
     # Check allow patterns
-    for pattern in ALLOW_PATTERNS:
-        if re.match(pattern, path):
-            return True
-    
-    return False
+    return ALLOW_RE.match(path) is not None
 
 def get_url_type(url, content=""):
     """Determine the type of page based on URL and content"""
@@ -167,175 +239,140 @@ def get_url_type(url, content=""):
             return "article"
         return "page"
 
-def extract_structured_data(html_content, url):
-    """Extract JSON-LD structured data from HTML content"""
-    import re
-    json_ld_scripts = re.findall(r'<script[^>]*type=[\'"]application/ld\+json[\'"][^>]*>(.*?)</script>', html_content, re.DOTALL)
-    
+def get_attr(node, name, default=""):
+    """Return an attribute value, treating valueless attributes as empty"""
+    return node.attributes.get(name) or default
+
+def extract_structured_data(json_ld_scripts, url):
+    """Extract JSON-LD structured data from the page's ld+json script bodies"""
     structured_data = []
     for script in json_ld_scripts:
         try:
-            data = json.loads(script)
+            data = orjson.loads(script)
             structured_data.append({
                 "url": url,
                 "schema": data
             })
-        except json.JSONDecodeError:
+        except orjson.JSONDecodeError:
             continue
     
     return structured_data
 
-def extract_seo_data(html_content, url):
-    """Extract SEO-related data from HTML content"""
-    import re
-    
+def extract_seo_data(tree, structured_data, url):
+    """Extract SEO-related data from a parsed HTML tree and already-decoded JSON-LD"""
     # Extract title
-    title_match = re.search(r'<title[^>]*>(.*?)</title>', html_content, re.DOTALL)
-    title = title_match.group(1).strip() if title_match else ""
-    
-    # Extract meta description
-    desc_match = re.search(r'<meta[^>]*name=[\'"]description[\'"][^>]*content=[\'"]([^\'"]*)[\'"]', html_content)
-    meta_description = desc_match.group(1) if desc_match else ""
-    
-    # Extract robots meta
-    robots_match = re.search(r'<meta[^>]*name=[\'"]robots[\'"][^>]*content=[\'"]([^\'"]*)[\'"]', html_content)
-    robots_meta = robots_match.group(1) if robots_match else ""
-    
-    # Extract Open Graph data
-    og_title_match = re.search(r'<meta[^>]*property=[\'"]og:title[\'"][^>]*content=[\'"]([^\'"]*)[\'"]', html_content)
-    og_title = og_title_match.group(1) if og_title_match else ""
-    
-    og_desc_match = re.search(r'<meta[^>]*property=[\'"]og:description[\'"][^>]*content=[\'"]([^\'"]*)[\'"]', html_content)
-    og_description = og_desc_match.group(1) if og_desc_match else ""
-    
-    og_image_match = re.search(r'<meta[^>]*property=[\'"]og:image[\'"][^>]*content=[\'"]([^\'"]*)[\'"]', html_content)
-    og_image = og_image_match.group(1) if og_image_match else ""
-    
-    # Extract Twitter card data
-    twitter_card_match = re.search(r'<meta[^>]*name=[\'"]twitter:card[\'"][^>]*content=[\'"]([^\'"]*)[\'"]', html_content)
-    twitter_card = twitter_card_match.group(1) if twitter_card_match else ""
-    
-    # Extract JSON-LD types
-    json_ld_scripts = re.findall(r'<script[^>]*type=[\'"]application/ld\+json[\'"][^>]*>(.*?)</script>', html_content, re.DOTALL)
+    title_tag = tree.css_first('title')
+    title = title_tag.text().strip() if title_tag else ""
+    
+    # Route every <meta> by its name/property in a single pass; the first
+    # tag for a key wins
+    meta = {}
+    for tag in tree.css('meta'):
+        key = get_attr(tag, 'name') or get_attr(tag, 'property')
+        if key in SEO_META_KEYS and key not in meta:
+            meta[key] = get_attr(tag, 'content')
+    
+    # Extract JSON-LD types from the blocks extract_structured_data decoded
     jsonld_types = []
-    for script in json_ld_scripts:
-        try:
-            data = json.loads(script)
-            if "@type" in data:
-                jsonld_types.append(data["@type"])
-            elif isinstance(data, list):
-                for item in data:
-                    if "@type" in item:
-                        jsonld_types.append(item["@type"])
-        except json.JSONDecodeError:
-            continue
+    for entry in structured_data:
+        data = entry["schema"]
+        
+        # A block holds either a single entity or a list of them
+        items = data if isinstance(data, list) else [data]
+        for item in items:
+            if isinstance(item, dict) and "@type" in item:
+                jsonld_types.append(item["@type"])
     
     return {
         "url": url,
         "title": title,
-        "meta_description": meta_description,
-        "robots_meta": robots_meta,
-        "og:title": og_title,
-        "og:description": og_description,
-        "og:image": og_image,
-        "twitter:card": twitter_card,
+        "meta_description": meta.get("description", ""),
+        "robots_meta": meta.get("robots", ""),
+        "og:title": meta.get("og:title", ""),
+        "og:description": meta.get("og:description", ""),
+        "og:image": meta.get("og:image", ""),
+        "twitter:card": meta.get("twitter:card", ""),
         "jsonld_types": jsonld_types
     }
 
-def extract_content_data(html_content, url):
-    """Extract content data from HTML"""
-    import re
-    from bs4 import BeautifulSoup
-    
-    try:
-        soup = BeautifulSoup(html_content, 'html.parser')
-    except:
-        # Fallback if BeautifulSoup fails
-        soup = None
-    
+def extract_content_data(tree, url):
+    """Extract content data from a parsed HTML tree"""
     # Extract H1
     h1 = ""
-    if soup:
-        h1_tag = soup.find('h1')
-        if h1_tag:
-            h1 = h1_tag.get_text(strip=True)
-    else:
-        h1_match = re.search(r'<h1[^>]*>(.*?)</h1>', html_content, re.DOTALL)
-        h1 = h1_match.group(1).strip() if h1_match else ""
+    h1_tag = tree.css_first('h1')
+    if h1_tag:
+        h1 = h1_tag.text(strip=True)
     
     # Extract breadcrumbs
     breadcrumbs = []
-    if soup:
-        breadcrumb_nav = soup.find('nav', class_=re.compile(r'.*breadcrumb.*'))
-        if breadcrumb_nav:
-            breadcrumb_links = breadcrumb_nav.find_all('a')
-            breadcrumbs = [link.get_text(strip=True) for link in breadcrumb_links]
+    breadcrumb_nav = tree.css_first('nav[class*="breadcrumb"]')
+    if breadcrumb_nav:
+        breadcrumb_links = breadcrumb_nav.css('a')
+        breadcrumbs = [link.text(strip=True) for link in breadcrumb_links]
     
     # Extract publish date (simplified)
     date_published = None
-    if soup:
-        # Look for common date patterns
-        time_tag = soup.find('time')
-        if time_tag and time_tag.get('datetime'):
-            date_published = time_tag.get('datetime')
+    # Look for common date patterns
+    time_tag = tree.css_first('time')
+    if time_tag and get_attr(time_tag, 'datetime'):
+        date_published = get_attr(time_tag, 'datetime')
     
     # Extract tags (simplified)
     tags = []
     
     # Extract summary (first paragraph)
     summary = ""
-    if soup:
-        first_p = soup.find('p')
-        if first_p:
-            summary = first_p.get_text(strip=True)[:200]  # First 200 chars
+    first_p = tree.css_first('p')
+    if first_p:
+        summary = first_p.text(strip=True)[:200]  # First 200 chars
     
     # Extract body blocks
     body_blocks = []
-    if soup:
-        # Extract paragraphs
-        paragraphs = soup.find_all('p')
-        for p in paragraphs:
-            text = p.get_text(strip=True)
+    
+    # Extract paragraphs
+    paragraphs = tree.css('p')
+    for p in paragraphs:
+        text = p.text(strip=True)
+        if text:
+            body_blocks.append({
+                "type": "paragraph",
+                "text": text
+            })
+    
+    # Extract headings
+    for i in range(1, 7):
+        headings = tree.css(f'h{i}')
+        for heading in headings:
+            text = heading.text(strip=True)
             if text:
                 body_blocks.append({
-                    "type": "paragraph",
+                    "type": "heading",
+                    "level": i,
                     "text": text
                 })
-        
-        # Extract headings
-        for i in range(1, 7):
-            headings = soup.find_all(f'h{i}')
-            for heading in headings:
-                text = heading.get_text(strip=True)
-                if text:
-                    body_blocks.append({
-                        "type": "heading",
-                        "level": i,
-                        "text": text
-                    })
-        
-        # Extract images
-        images = soup.find_all('img')
-        for img in images:
-            src = img.get('src', '')
-            alt = img.get('alt', '')
-            if src:
-                body_blocks.append({
-                    "type": "image",
-                    "src": src,
-                    "alt": alt
-                })
-        
-        # Extract lists
-        lists = soup.find_all(['ul', 'ol'])
-        for lst in lists:
-            items = [li.get_text(strip=True) for li in lst.find_all('li')]
-            if items:
-                body_blocks.append({
-                    "type": "list",
-                    "ordered": lst.name == 'ol',
-                    "items": items
-                })
+    
+    # Extract images
+    images = tree.css('img')
+    for img in images:
+        src = get_attr(img, 'src')
+        alt = get_attr(img, 'alt')
+        if src:
+            body_blocks.append({
+                "type": "image",
+                "src": src,
+                "alt": alt
+            })
+    
+    # Extract lists
+    lists = tree.css('ul, ol')
+    for lst in lists:
+        items = [li.text(strip=True) for li in lst.css('li')]
+        if items:
+            body_blocks.append({
+                "type": "list",
+                "ordered": lst.tag == 'ol',
+                "items": items
+            })
     
     return {
         "url": url,
@@ -348,154 +385,115 @@ def extract_content_data(html_content, url):
         "body_blocks": body_blocks
     }
 
-def extract_media_data(html_content, url):
-    """Extract media data from HTML"""
-    import re
-    from bs4 import BeautifulSoup
-    
-    try:
-        soup = BeautifulSoup(html_content, 'html.parser')
-    except:
-        soup = None
-    
+@dataclass(slots=True)
+class MediaRow:
+    """A media.csv row; fields are in column order"""
+    url: str
+    page_url: str
+    alt: str
+    width: str
+    height: str
+    type: str
+    filesize: str
+    loading_attr: str
+    srcset_count: int
+
+def extract_media_data(tree, url):
+    """Extract media data from a parsed HTML tree"""
     media_entries = []
     
-    # Extract images
-    if soup:
-        images = soup.find_all('img')
-        for img in images:
-            src = img.get('src', '')
-            if src:
-                media_entries.append({
-                    "url": src,
-                    "page_url": url,
-                    "alt": img.get('alt', ''),
-                    "width": img.get('width', ''),
-                    "height": img.get('height', ''),
-                    "type": "image",
-                    "filesize": "",  # Would need HEAD request to determine
-                    "loading_attr": img.get('loading', ''),
-                    "srcset_count": len(img.get('srcset', '').split(',')) if img.get('srcset') else 0
-                })
+    # Walk images, videos, audio and their sources in one document-order pass
+    for node in tree.css('img, video, audio, source'):
+        src = get_attr(node, 'src')
+        if not src:
+            continue
         
-        # Extract videos
-        videos = soup.find_all('video')
-        for video in videos:
-            src = video.get('src', '')
-            if src:
-                media_entries.append({
-                    "url": src,
-                    "page_url": url,
-                    "alt": "",
-                    "width": video.get('width', ''),
-                    "height": video.get('height', ''),
-                    "type": "video",
-                    "filesize": "",
-                    "loading_attr": "",
-                    "srcset_count": 0
-                })
-            
-            # Check sources within video
-            sources = video.find_all('source')
-            for source in sources:
-                src = source.get('src', '')
-                if src:
-                    media_entries.append({
-                        "url": src,
-                        "page_url": url,
-                        "alt": "",
-                        "width": "",
-                        "height": "",
-                        "type": "video",
-                        "filesize": "",
-                        "loading_attr": "",
-                        "srcset_count": 0
-                    })
+        tag = node.tag
         
-        # Extract audio
-        audios = soup.find_all('audio')
-        for audio in audios:
-            src = audio.get('src', '')
-            if src:
-                media_entries.append({
-                    "url": src,
-                    "page_url": url,
-                    "alt": "",
-                    "width": "",
-                    "height": "",
-                    "type": "audio",
-                    "filesize": "",
-                    "loading_attr": "",
-                    "srcset_count": 0
-                })
-            
-            # Check sources within audio
-            sources = audio.find_all('source')
-            for source in sources:
-                src = source.get('src', '')
-                if src:
-                    media_entries.append({
-                        "url": src,
-                        "page_url": url,
-                        "alt": "",
-                        "width": "",
-                        "height": "",
-                        "type": "audio",
-                        "filesize": "",
-                        "loading_attr": "",
-                        "srcset_count": 0
-                    })
+        # Extract images
+        if tag == 'img':
+            srcset = get_attr(node, 'srcset')
+            media_entries.append(MediaRow(
+                url=src,
+                page_url=url,
+                alt=get_attr(node, 'alt'),
+                width=get_attr(node, 'width'),
+                height=get_attr(node, 'height'),
+                type="image",
+                filesize="",  # Would need HEAD request to determine
+                loading_attr=get_attr(node, 'loading'),
+                srcset_count=len(srcset.split(',')) if srcset else 0
+            ))
+            continue
+        
+        # Sources take their type from the enclosing <video>/<audio>;
+        # <picture> sources are covered by the picture's <img>
+        if tag == 'source':
+            parent = node.parent
+            media_type = parent.tag if parent is not None else ""
+            if media_type not in ('video', 'audio'):
+                continue
+            width = height = ""
+        else:
+            media_type = tag
+            # Only videos carry meaningful dimensions
+            width = get_attr(node, 'width') if tag == 'video' else ""
+            height = get_attr(node, 'height') if tag == 'video' else ""
+        
+        media_entries.append(MediaRow(
+            url=src,
+            page_url=url,
+            alt="",
+            width=width,
+            height=height,
+            type=media_type,
+            filesize="",
+            loading_attr="",
+            srcset_count=0
+        ))
     
     return media_entries
 
-def extract_forms_data(html_content, url):
-    """Extract form data from HTML"""
-    import re
-    from bs4 import BeautifulSoup
-    
-    try:
-        soup = BeautifulSoup(html_content, 'html.parser')
-    except:
-        return []
-    
-    forms = soup.find_all('form')
+def extract_forms_data(tree, url):
+    """Extract form data from a parsed HTML tree"""
+    forms = tree.css('form')
     forms_entries = []
     
     for form in forms:
-        form_name = form.get('name', '')
-        method = form.get('method', 'GET').upper()
-        action = form.get('action', '')
+        form_name = get_attr(form, 'name')
+        method = get_attr(form, 'method', 'GET').upper()
+        action = get_attr(form, 'action')
         
         # Resolve relative action URL
         if action:
             action = urljoin(url, action)
         
         # Check for reCAPTCHA
-        has_recaptcha = bool(form.find_all('div', class_=re.compile(r'.*g-recaptcha.*'))) or \
-                        bool(form.find_all('input', {'name': 'g-recaptcha-response'}))
+        has_recaptcha = form.css_first('div[class*="g-recaptcha"]') is not None or \
+                        form.css_first('input[name="g-recaptcha-response"]') is not None
         
         # Extract fields
         fields = []
-        field_elements = form.find_all(['input', 'select', 'textarea'])
+        field_elements = form.css('input, select, textarea')
         
         for field in field_elements:
             field_data = {
-                "name": field.get('name', ''),
-                "type": field.get('type', 'text'),
-                "required": field.get('required') is not None
+                "name": get_attr(field, 'name'),
+                "type": get_attr(field, 'type', 'text'),
+                "required": 'required' in field.attributes
             }
             
             # Add additional attributes based on field type
-            if field.name == 'input':
-                if field.get('type') == 'text':
-                    minlength = field.get('minlength')
+            if field.tag == 'input':
+                if get_attr(field, 'type') == 'text':
+                    minlength = get_attr(field, 'minlength')
                     if minlength:
                         field_data['minlength'] = minlength
-                elif field.get('type') == 'email':
+                elif get_attr(field, 'type') == 'email':
                     # Email validation is implicit
                     pass
-            elif field.name == 'textarea':
-                minlength = field.get('minlength')
+            elif field.tag == 'textarea':
+                minlength = get_attr(field, 'minlength')
                 if minlength:
                     field_data['minlength'] = minlength
             
@@ -503,9 +501,9 @@ def extract_forms_data(html_content, url):
         
         # Check for honeypot fields (hidden fields that shouldn't be filled)
         honeypot_field = None
-        hidden_fields = form.find_all('input', {'type': 'hidden'})
+        hidden_fields = form.css('input[type="hidden"]')
         for field in hidden_fields:
-            name = field.get('name', '').lower()
+            name = get_attr(field, 'name').lower()
             # Common honeypot field names
             if any(keyword in name for keyword in ['website', 'url', 'honeypot', 'bot']):
                 honeypot_field = name
@@ -533,126 +531,119 @@ def extract_forms_data(html_content, url):
     
     return forms_entries
 
+# Fixed-schema JSONL records; orjson encodes these straight from their slots,
+# without building a dict per record first
+@dataclass(slots=True)
+class Integration:
+    """A third-party tool found on a page"""
+    page_url: str
+    tool: str
+    id: str
+    loaded_from: str
+
+@dataclass(slots=True)
+class ApiEndpoint:
+    """An API URL referenced from a page's inline JS"""
+    page_url: str
+    method: str
+    url: str
+    status: str
+    content_type: str
+
 def extract_integrations(html_content, url):
     """Extract third-party integrations from HTML"""
-    import re
-    
     integrations = []
     
-    # Google Analytics 4 / Google Tag Manager
-    ga4_matches = re.findall(r'gtag\([^)]*\'(G-[A-Z0-9]+)\'', html_content)
-    for match in ga4_matches:
-        integrations.append({
-            "page_url": url,
-            "tool": "GA4",
-            "id": match,
-            "loaded_from": "https://www.googletagmanager.com/gtag/js"
-        })
-    
-    gtm_matches = re.findall(r'GTM-[A-Z0-9]+', html_content)
-    for match in gtm_matches:
-        integrations.append({
-            "page_url": url,
-            "tool": "GTM",
-            "id": match,
-            "loaded_from": "https://www.googletagmanager.com"
-        })
-    
-    # Meta Pixel
-    pixel_matches = re.findall(r'fbq\([^)]*\'track\'[^)]*\'[A-Z0-9]+\'', html_content)
-    if pixel_matches:
-        integrations.append({
-            "page_url": url,
-            "tool": "Meta Pixel",
-            "id": "detected",
-            "loaded_from": "https://connect.facebook.net"
-        })
-    
-    # Hotjar
-    hotjar_matches = re.findall(r'hj\([^)]*\'[0-9]+\'', html_content)
-    if hotjar_matches:
-        integrations.append({
-            "page_url": url,
-            "tool": "Hotjar",
-            "id": "detected",
-            "loaded_from": "https://static.hotjar.com"
-        })
-    
-    # Intercom
-    if 'intercom' in html_content.lower():
-        integrations.append({
-            "page_url": url,
-            "tool": "Intercom",
-            "id": "detected",
-            "loaded_from": "https://widget.intercom.io"
-        })
-    
-    # Google Maps
-    if 'maps.googleapis.com' in html_content:
-        integrations.append({
-            "page_url": url,
-            "tool": "Google Maps",
-            "id": "detected",
-            "loaded_from": "https://maps.googleapis.com"
-        })
+    # Scan the page once; each match is routed by the group that fired
+    ga4_ids = []
+    gtm_ids = []
+    detected = set()
+    for match in INTEGRATION_RE.finditer(html_content):
+        kind = match.lastgroup
+        if kind == "ga4":
+            ga4_ids.append(match.group("ga4"))
+        elif kind == "gtm":
+            gtm_ids.append(match.group("gtm"))
+        else:
+            detected.add(kind)
     
-    # reCAPTCHA
-    if 'recaptcha' in html_content.lower():
-        integrations.append({
-            "page_url": url,
-            "tool": "reCAPTCHA",
-            "id": "detected",
-            "loaded_from": "https://www.google.com/recaptcha"
-        })
+    # Google Analytics 4 / Google Tag Manager
+    for ga4_id in ga4_ids:
+        integrations.append(Integration(
+            page_url=url,
+            tool="GA4",
+            id=ga4_id,
+            loaded_from="https://www.googletagmanager.com/gtag/js"
+        ))
+    
+    for gtm_id in gtm_ids:
+        integrations.append(Integration(
+            page_url=url,
+            tool="GTM",
+            id=gtm_id,
+            loaded_from="https://www.googletagmanager.com"
+        ))
+    
+    # Tools recorded once per page when present
+    for kind, tool, loaded_from in DETECTED_INTEGRATIONS:
+        if kind in detected:
+            integrations.append(Integration(
+                page_url=url,
+                tool=tool,
+                id="detected",
+                loaded_from=loaded_from
+            ))
     
     return integrations
 
-def extract_api_endpoints(html_content, url):
-    """Extract API endpoints from HTML (from JS code)"""
-    import re
-    
+def extract_api_endpoints(tree, url):
+    """Extract API endpoints from the page's inline JS code"""
     api_endpoints = []
     
-    # Simple pattern for API endpoints in JS
-    # This is a basic implementation - in a real crawler, you'd want to parse JS properly
-    api_patterns = [
-        r'https?://[^\'"\s]*api[^\'"\s]*',
-        r'https?://[^\'"\s]*\.json',
-        r'fetch\([\'"]([^\'"]*)[\'"]\)',
-        r'axios\.get\([\'"]([^\'"]*)[\'"]\)'
-    ]
-    
-    for pattern in api_patterns:
-        matches = re.findall(pattern, html_content)
-        for match in matches:
+    # Only script bodies can hold JS calls; JSON-LD blocks are data, not code
+    for script in tree.css('script'):
+        if get_attr(script, 'type') == 'application/ld+json':
+            continue
+        
+        for api_match in API_RE.finditer(script.text()):
+            match = api_match.group(api_match.lastgroup)
             # If it's just the URL (not the full JS code)
             if match:
                 endpoint_url = match if 'http' in match else urljoin(url, match)
-                api_endpoints.append({
-                    "page_url": url,
-                    "method": "GET",  # Default assumption
-                    "url": endpoint_url,
-                    "status": "",  # Will be filled during actual request
-                    "content_type": ""  # Will be filled during actual request
-                })
+                api_endpoints.append(ApiEndpoint(
+                    page_url=url,
+                    method="GET",  # Default assumption
+                    url=endpoint_url,
+                    status="",  # Will be filled during actual request
+                    content_type=""  # Will be filled during actual request
+                ))
     
     return api_endpoints
 
-async def fetch_page(session, url, depth=0, discovered_from=""):
+def decode_html(raw, header_charset):
+    """Decode a page body using the header charset, then a <meta> charset, then UTF-8"""
+    charset = header_charset
+    if not charset:
+        meta_match = META_CHARSET_RE.search(raw, 0, META_CHARSET_SCAN_BYTES)
+        if meta_match:
+            charset = meta_match.group(1).decode('ascii')
+    try:
+        return raw.decode(charset or 'utf-8', errors='replace')
+    except LookupError:
+        # Unknown charset label
+        return raw.decode('utf-8', errors='replace')
+
+async def fetch_page(session, writers, url, depth=0, discovered_from=""):
     """Fetch a page and extract data"""
-    global visited_urls, url_content_hashes, redirect_map, error_log
+    global visited_urls, url_content_hashes
     
     # Normalize URL
     normalized_url = normalize_url(url)
     
-    # Check if already visited
-    if normalized_url in visited_urls:
-        return []
-    
-    # Check if within allowed paths
+    # Check if within allowed paths; skips are logged whatever the crawl state
     if not is_allowed_url(normalized_url):
         logger.info(f"Skipping non-English URL: {normalized_url}")
-        error_log.append({
+        writers.errors.writerow({
             "url": normalized_url,
             "status": "skipped",
             "referrer": discovered_from,
@@ -660,85 +651,96 @@ async def fetch_page(session, url, depth=0, discovered_from=""):
         })
         return []
     
-    # Limit to max pages
-    if len(visited_urls) >= MAX_PAGES:
+    # Check if already visited or over the page budget. Together with the add
+    # below this runs before the first await, so concurrent tasks can't both
+    # claim the same URL
+    if normalized_url in visited_urls or len(visited_urls) >= MAX_PAGES:
         return []
     
     visited_urls.add(normalized_url)
     
     try:
-        async with semaphore:  # Limit concurrent requests
-            # Add delay to respect rate limits
-            await asyncio.sleep(REQUEST_DELAY)
+        # Wait for a token to respect the global request rate
+        await rate_limiter.acquire()
+        
+        # Make request
+        async with session.get(normalized_url, timeout=aiohttp.ClientTimeout(total=45)) as response:
+            status = response.status
+            content_type = response.headers.get('content-type', '')
             
-            # Make request
-            async with session.get(normalized_url, timeout=aiohttp.ClientTimeout(total=45)) as response:
-                status = response.status
-                content_type = response.headers.get('content-type', '')
-                
-                # Handle redirects
-                if status in [301, 302, 303, 307, 308]:
-                    location = response.headers.get('location', '')
-                    if location:
-                        redirect_map.append({
-                            "from": normalized_url,
-                            "to": location,
-                            "http_status": status,
-                            "via": "header"
-                        })
-                        # Follow redirect if within depth limit
-                        if depth < MAX_DEPTH:
-                            redirect_url = urljoin(normalized_url, location)
-                            return await fetch_page(session, redirect_url, depth+1, discovered_from=normalized_url)
-                
-                # Handle errors
-                if status >= 400:
-                    error_log.append({
-                        "url": normalized_url,
-                        "status": status,
-                        "referrer": discovered_from,
-                        "notes": f"HTTP {status}"
-                    })
-                    return []
-                
-                # Only process HTML content
-                if 'text/html' not in content_type:
-                    return []
-                
-                # Read content
-                html_content = await response.text()
-                
-                # Calculate content hash to detect duplicates
-                content_hash = hashlib.md5(html_content.encode('utf-8')).hexdigest()
-                if content_hash in url_content_hashes:
-                    # This is a duplicate page
-                    url_inventory.append({
-                        "url": normalized_url,
-                        "type": "duplicate",
-                        "template": "",
-                        "depth": depth,
-                        "status": status,
-                        "redirected_from": "",
-                        "canonical": "",
-                        "hreflang": "",
-                        "paginated": False,
-                        "discovered_from": discovered_from,
-                        "duplicate_of": url_content_hashes[content_hash]
+            # Handle redirects
+            if status in [301, 302, 303, 307, 308]:
+                location = response.headers.get('location', '')
+                if location:
+                    writers.redirects.writerow({
+                        "from": normalized_url,
+                        "to": location,
+                        "http_status": status,
+                        "via": "header"
                     })
-                    return []
-                
+                    # Follow redirect if within depth limit
+                    if depth < MAX_DEPTH:
+                        redirect_url = urljoin(normalized_url, location)
+                        return await fetch_page(session, writers, redirect_url, depth+1, discovered_from=normalized_url)
+            
+            # Handle errors
+            if status >= 400:
+                writers.errors.writerow({
+                    "url": normalized_url,
+                    "status": status,
+                    "referrer": discovered_from,
+                    "notes": f"HTTP {status}"
+                })
+                return []
+            
+            # Only process HTML content
+            if 'text/html' not in content_type:
+                return []
+            
+            # Read content once and decode it ourselves; response.text() would
+            # run charset detection on pages without a declared charset
+            raw = await response.read()
+            html_content = decode_html(raw, response.charset)
+            
+            # Calculate content hash on the raw bytes to detect duplicates
+            # The lookup and insert have no await between them, so they are
+            # atomic on the event loop and need no lock
+            content_hash = xxhash.xxh3_128_digest(raw)
+            duplicate_of = url_content_hashes.get(content_hash)
+            if duplicate_of is None:
                 url_content_hashes[content_hash] = normalized_url
-                
-                # Extract data
-                await extract_page_data(session, normalized_url, html_content, status, depth, discovered_from)
-                
-                # Find new URLs to crawl
-                new_urls = await find_links(session, normalized_url, html_content, depth)
-                
-                return new_urls
-                
+            
+            if duplicate_of is not None:
+                # This is a duplicate page
+                url_inventory.append({
+                    "url": normalized_url,
+                    "type": "duplicate",
+                    "template": "",
+                    "depth": depth,
+                    "status": status,
+                    "redirected_from": "",
+                    "canonical": "",
+                    "hreflang": "",
+                    "paginated": False,
+                    "discovered_from": discovered_from,
+                    "duplicate_of": duplicate_of
+                })
+                url_type_counts["duplicate"] += 1
+                return []
+            
+            # Parse the DOM once and share it between extraction and link discovery
+            tree = LexborHTMLParser(html_content)
+            
+            # Extract data
+            await extract_page_data(session, writers, normalized_url, html_content, raw, tree, status, depth, discovered_from)
+            
+            # Find new URLs to crawl
+            new_urls = await find_links(session, normalized_url, tree, depth)
+            
+            return new_urls
+            
     except asyncio.TimeoutError:
-        error_log.append({
+        writers.errors.writerow({
             "url": normalized_url,
             "status": "timeout",
             "referrer": discovered_from,
@@ -746,7 +748,7 @@ async def fetch_page(session, url, depth=0, discovered_from=""):
         })
         return []
     except Exception as e:
-        error_log.append({
+        writers.errors.writerow({
             "url": normalized_url,
             "status": "error",
             "referrer": discovered_from,
@@ -754,38 +756,49 @@ async def fetch_page(session, url, depth=0, discovered_from=""):
         })
         return []
 
-async def extract_page_data(session, url, html_content, status, depth, discovered_from):
+async def extract_page_data(session, writers, url, html_content, raw, tree, status, depth, discovered_from):
     """Extract all data from a page"""
     # Determine page type
     page_type = get_url_type(url, html_content)
     
+    # Collect JSON-LD blocks once
+    json_ld_scripts = JSONLD_RE.findall(html_content)
+    
     # Extract structured data
-    structured_data = extract_structured_data(html_content, url)
-    structured_data_entries.extend(structured_data)
+    structured_data = extract_structured_data(json_ld_scripts, url)
+    writers.structured_data.writerows(structured_data)
     
-    # Extract SEO data
-    seo_info = extract_seo_data(html_content, url)
-    seo_data.append(seo_info)
+    # Extract SEO data, reusing the decoded JSON-LD for its @types
+    seo_info = extract_seo_data(tree, structured_data, url)
+    writers.seo.writerow(seo_info)
     
     # Extract content data
-    content_info = extract_content_data(html_content, url)
-    content_data.append(content_info)
+    content_info = extract_content_data(tree, url)
+    writers.content.writerow(content_info)
+    
+    # The extractors below are skipped when a cheap prefilter check on the
+    # raw bytes shows the page can't contain anything for them
     
     # Extract media data
-    media_info = extract_media_data(html_content, url)
-    media_data.extend(media_info)
+    if MEDIA_PREFILTER_RE.search(raw):
+        media_info = extract_media_data(tree, url)
+        writers.media.writerows(media_info)
     
     # Extract forms data
-    forms_info = extract_forms_data(html_content, url)
-    forms_data.extend(forms_info)
+    forms_info = extract_forms_data(tree, url) if FORM_PREFILTER_RE.search(raw) else []
+    writers.forms_jsonl.writerows(forms_info)
+    
+    # The CSV sink keeps only its own columns of each form
+    writers.forms_csv.writerows(forms_info)
     
     # Extract integrations
-    integration_info = extract_integrations(html_content, url)
-    integrations.extend(integration_info)
+    if INTEGRATION_PREFILTER_RE.search(raw):
+        integration_info = extract_integrations(html_content, url)
+        writers.integrations.writerows(integration_info)
     
     # Extract API endpoints (from JS)
-    api_info = extract_api_endpoints(html_content, url)
-    api_endpoints.extend(api_info)
+    api_info = extract_api_endpoints(tree, url)
+    writers.api_endpoints.writerows(api_info)
     
     # Try to identify if page is paginated
     is_paginated = "?page=" in url or "/page/" in url
@@ -803,213 +816,265 @@ async def extract_page_data(session, url, html_content, status, depth, discovere
         "paginated": is_paginated,
         "discovered_from": discovered_from
     })
+    url_type_counts[page_type] += 1
 
-async def find_links(session, base_url, html_content, current_depth):
+async def find_links(session, base_url, tree, current_depth):
     """Find all links on a page that should be crawled"""
-    import re
-    from bs4 import BeautifulSoup
-    
     if current_depth >= MAX_DEPTH:
         return []
     
-    try:
-        soup = BeautifulSoup(html_content, 'html.parser')
-    except:
-        # Fallback to regex
-        soup = None
-    
     links = []
     
-    if soup:
-        # Find all <a> tags
-        anchor_tags = soup.find_all('a', href=True)
-        for tag in anchor_tags:
-            href = tag['href']
-            absolute_url = urljoin(base_url, href)
-            links.append(absolute_url)
+    # Handle pagination - look for "Load more" buttons or pagination links
+    pagination_links = []
+    
+    # Navigation repeats the same hrefs many times per page, so resolve each once
+    seen_hrefs = set()
+    
+    # Find all <a> tags
+    anchor_tags = tree.css('a[href]')
+    for tag in anchor_tags:
+        href = get_attr(tag, 'href')
+        if href in seen_hrefs:
+            continue
+        seen_hrefs.add(href)
         
-        # Handle pagination - look for "Load more" buttons or pagination links
-        pagination_links = []
+        absolute_url = urljoin(base_url, href)
+        links.append(absolute_url)
         
         # Check for common pagination patterns
-        page_links = soup.find_all('a', href=re.compile(r'(\?page=|/page/)\d+'))
-        for link in page_links:
-            href = link['href']
-            absolute_url = urljoin(base_url, href)
+        if PAGINATION_HREF_RE.search(href):
             pagination_links.append(absolute_url)
-        
-        # Limit pagination links
-        links.extend(pagination_links[:MAX_PAGINATION_PAGES])
-    else:
-        # Fallback regex approach
-        href_matches = re.findall(r'href=[\'"]([^\'"]*)[\'"]', html_content)
-        for href in href_matches:
-            absolute_url = urljoin(base_url, href)
-            links.append(absolute_url)
+    
+    # Limit pagination links
+    links.extend(pagination_links[:MAX_PAGINATION_PAGES])
     
     # Filter and normalize links
     valid_links = []
+    seen_links = set()
     for link in links:
+        # Dedup on the normalized form so links differing only by fragment
+        # or tracking params collapse to one
         normalized = normalize_url(link)
-        if is_allowed_url(normalized) and normalized not in visited_urls:
+        if normalized in seen_links:
+            continue
+        seen_links.add(normalized)
+        
+        # The visited check is cheaper than the allow/deny patterns
+        if normalized not in visited_urls and is_allowed_url(normalized):
             valid_links.append(normalized)
     
     return valid_links
 
+async def crawl_worker(session, writers, queue, queued):
+    """Fetch queued URLs and enqueue the links discovered on them"""
+    while True:
+        url, depth, discovered_from = await queue.get()
+        try:
+            new_urls = await fetch_page(session, writers, url, depth, discovered_from)
+            
+            # Links found at the last allowed depth are not crawled
+            if depth + 1 < MAX_DEPTH:
+                for new_url in new_urls:
+                    # Many pages link to the same URL before it is fetched;
+                    # enqueue each one only once
+                    if new_url in queued:
+                        continue
+                    queued.add(new_url)
+                    queue.put_nowait((new_url, depth + 1, url))
+        except Exception as e:
+            logger.error(f"Error crawling: {e}")
+        finally:
+            queue.task_done()
+
 async def crawl_website():
     """Main crawling function"""
-    # Initialize aiohttp session
-    async with aiohttp.ClientSession() as session:
-        # Start with base URL
-        urls_to_crawl = [BASE_URL]
-        current_depth = 0
-        
-        while urls_to_crawl and len(visited_urls) < MAX_PAGES and current_depth < MAX_DEPTH:
-            # Process URLs at current depth
-            next_urls = []
-            
-            # Limit concurrent tasks
-            tasks = [fetch_page(session, url, current_depth) for url in urls_to_crawl[:10]]  # Process 10 at a time
-            results = await asyncio.gather(*tasks, return_exceptions=True)
+    # Resolve every output path once up front
+    paths = {name: os.path.join(OUTPUT_DIR, name) for name in OUTPUT_FILES}
+    
+    # Initialize aiohttp session; the connector pools keep-alive connections
+    # and caps how many requests are in flight against the host
+    connector = aiohttp.TCPConnector(
+        limit=MAX_CONNECTIONS,
+        limit_per_host=CONCURRENT_REQUESTS,
+        ttl_dns_cache=300,
+        keepalive_timeout=30
+    )
+    with open_writers(paths) as writers:
+        async with aiohttp.ClientSession(connector=connector) as session:
+            # Start with base URL
+            queue = asyncio.Queue()
+            queue.put_nowait((BASE_URL, 0, ""))
+            queued = {BASE_URL}
             
-            # Collect new URLs
-            for result in results:
-                if isinstance(result, list):
-                    next_urls.extend(result)
-                elif isinstance(result, Exception):
-                    logger.error(f"Error crawling: {result}")
+            # Workers keep pulling URLs as soon as they are discovered, so the
+            # connection pool stays busy across depth boundaries
+            workers = [asyncio.create_task(crawl_worker(session, writers, queue, queued)) for _ in range(WORKERS)]
             
-            # Prepare for next depth
-            urls_to_crawl = list(set(next_urls))  # Remove duplicates
-            current_depth += 1
+            # The queue drains once every fetched page has enqueued its links
+            await queue.join()
+            for worker in workers:
+                worker.cancel()
+            await asyncio.gather(*workers, return_exceptions=True)
             
-            logger.info(f"Depth {current_depth}: {len(urls_to_crawl)} URLs to crawl, {len(visited_urls)} visited so far")
+            logger.info(f"Crawl finished: {len(visited_urls)} URLs visited")
         
-        # Save all data
-        save_data()
+        # Save the remaining data
+        await save_data(writers, paths)
+
+class CsvSink:
+    """CSV output written row by row while the crawl runs"""
+    
+    def __init__(self, path, fieldnames, buffering=-1):
+        self.file = open(path, "w", newline="", encoding="utf-8", buffering=buffering)
+        # The schema is fixed, so rows go to the plain csv.writer as tuples
+        # and skip DictWriter's per-row key validation
+        self.fieldnames = tuple(fieldnames)
+        self.writer = csv.writer(self.file)
+        self.writer.writerow(self.fieldnames)
+        self.get_columns = attrgetter(*self.fieldnames)
+        self.count = 0
+    
+    def project(self, row):
+        """Pick this file's columns out of a row; extra keys are dropped"""
+        if isinstance(row, dict):
+            return tuple(row.get(name, "") for name in self.fieldnames)
+        # Row objects carry the columns as attributes
+        return self.get_columns(row)
+    
+    def writerow(self, row):
+        self.writer.writerow(self.project(row))
+        self.count += 1
+    
+    def writerows(self, rows):
+        self.writer.writerows(map(self.project, rows))
+        self.count += len(rows)
+    
+    def close(self):
+        self.file.close()
+
+class JsonlSink:
+    """JSON Lines output written record by record while the crawl runs"""
+    
+    def __init__(self, path, buffering=-1, compressor=None):
+        # orjson emits UTF-8 bytes, so the file is written in binary mode
+        if compressor is not None:
+            # Closing the stream writer finishes the frame and closes the file
+            self.file = compressor.stream_writer(open(path + ".zst", "wb", buffering=buffering))
+        else:
+            self.file = open(path, "wb", buffering=buffering)
+        self.count = 0
+    
+    def writerow(self, item):
+        self.file.write(orjson.dumps(item, option=orjson.OPT_APPEND_NEWLINE))
+        self.count += 1
+    
+    def writerows(self, items):
+        # Encode a page's records up front and hand them to the file in one write;
+        # orjson appends each newline itself, so join copies every record once
+        if not items:
+            return
+        self.file.write(b"".join(orjson.dumps(item, option=orjson.OPT_APPEND_NEWLINE) for item in items))
+        self.count += len(items)
+    
+    def close(self):
+        self.file.close()
+
+Writers = namedtuple("Writers", [
+    "seo", "structured_data", "content", "media", "forms_csv", "forms_jsonl",
+    "integrations", "api_endpoints", "redirects", "errors", "hreflang_map"
+])
 
-def save_data():
-    """Save all collected data to files"""
-    # Save URL inventory
-    with open(os.path.join(OUTPUT_DIR, "urls.csv"), "w", newline="", encoding="utf-8") as f:
+@contextmanager
+def open_writers(paths):
+    """Open every streamed output file for the duration of the crawl"""
+    # Resolve compression before any output file is opened (and truncated)
+    if COMPRESS_JSONL:
+        try:
+            import zstandard
+        except ImportError as e:
+            raise RuntimeError("COMPRESS_JSONL needs zstandard; install it with: pip install zstandard") from e
+        # A compressor context can't be shared between streams, so each sink gets its own
+        def new_compressor():
+            return zstandard.ZstdCompressor(level=3, threads=-1)
+    else:
+        def new_compressor():
+            return None
+    
+    writers = Writers(
+        seo=CsvSink(paths["seo.csv"],
+                    ["url", "title", "meta_description", "robots_meta", "og:title",
+                     "og:description", "og:image", "twitter:card", "jsonld_types"],
+                    buffering=LARGE_WRITE_BUFFER),
+        structured_data=JsonlSink(paths["structured_data.jsonl"], compressor=new_compressor(),
+                                  buffering=LARGE_WRITE_BUFFER),
+        content=JsonlSink(paths["content.jsonl"], compressor=new_compressor(), buffering=LARGE_WRITE_BUFFER),
+        media=CsvSink(paths["media.csv"],
+                      ["url", "page_url", "alt", "width", "height", "type", "filesize",
+                       "loading_attr", "srcset_count"],
+                      buffering=LARGE_WRITE_BUFFER),
+        forms_csv=CsvSink(paths["forms.csv"],
+                          ["page_url", "form_name", "method", "action", "has_recaptcha",
+                           "fields_count", "success_text", "error_text"]),
+        forms_jsonl=JsonlSink(paths["forms.jsonl"], compressor=new_compressor()),
+        integrations=JsonlSink(paths["integrations.jsonl"], compressor=new_compressor(),
+                               buffering=LARGE_WRITE_BUFFER),
+        api_endpoints=JsonlSink(paths["api_endpoints.jsonl"], compressor=new_compressor(),
+                                buffering=LARGE_WRITE_BUFFER),
+        redirects=CsvSink(paths["redirects.csv"],
+                          ["from", "to", "http_status", "via"]),
+        errors=CsvSink(paths["errors.csv"],
+                       ["url", "status", "referrer", "notes"]),
+        # Placeholder until hreflang alternates are extracted
+        hreflang_map=JsonlSink(paths["hreflang_map.jsonl"], compressor=new_compressor())
+    )
+    try:
+        yield writers
+    finally:
+        for sink in writers:
+            sink.close()
+
+def write_url_inventory(path, rows):
+    """Write the URL inventory as CSV"""
+    with open(path, "w", newline="", encoding="utf-8", buffering=LARGE_WRITE_BUFFER) as f:
         fieldnames = ["url", "type", "template", "depth", "status", "redirected_from", 
                      "canonical", "hreflang", "paginated", "discovered_from"]
-        writer = csv.DictWriter(f, fieldnames=fieldnames)
-        writer.writeheader()
-        writer.writerows(url_inventory)
-    
-    # Save SEO data
-    with open(os.path.join(OUTPUT_DIR, "seo.csv"), "w", newline="", encoding="utf-8") as f:
-        fieldnames = ["url", "title", "meta_description", "robots_meta", "og:title", 
-                     "og:description", "og:image", "twitter:card", "jsonld_types"]
-        writer = csv.DictWriter(f, fieldnames=fieldnames)
-        writer.writeheader()
-        writer.writerows(seo_data)
-    
-    # Save structured data
-    with open(os.path.join(OUTPUT_DIR, "structured_data.jsonl"), "w", encoding="utf-8") as f:
-        for item in structured_data_entries:
-            f.write(json.dumps(item, ensure_ascii=False) + "\n")
-    
-    # Save content data
-    with open(os.path.join(OUTPUT_DIR, "content.jsonl"), "w", encoding="utf-8") as f:
-        for item in content_data:
-            f.write(json.dumps(item, ensure_ascii=False) + "\n")
-    
-    # Save media data
-    with open(os.path.join(OUTPUT_DIR, "media.csv"), "w", newline="", encoding="utf-8") as f:
-        fieldnames = ["url", "page_url", "alt", "width", "height", "type", "filesize", 
-                     "loading_attr", "srcset_count"]
-        writer = csv.DictWriter(f, fieldnames=fieldnames)
+        # Duplicate entries also record duplicate_of, which has no column here
+        writer = csv.DictWriter(f, fieldnames=fieldnames, extrasaction="ignore")
         writer.writeheader()
-        writer.writerows(media_data)
-    
-    # Save forms data
-    with open(os.path.join(OUTPUT_DIR, "forms.csv"), "w", newline="", encoding="utf-8") as f:
-        fieldnames = ["page_url", "form_name", "method", "action", "has_recaptcha", 
-                     "fields_count", "success_text", "error_text"]
-        writer = csv.DictWriter(f, fieldnames=fieldnames)
-        writer.writeheader()
-        # Extract CSV-compatible data from forms_data
-        csv_forms = []
-        for form in forms_data:
-            csv_form = {
-                "page_url": form["page_url"],
-                "form_name": form["form_name"],
-                "method": form["method"],
-                "action": form["action"],
-                "has_recaptcha": form["has_recaptcha"],
-                "fields_count": form["fields_count"],
-                "success_text": form["success_text"],
-                "error_text": form["error_text"]
-            }
-            csv_forms.append(csv_form)
-        writer.writerows(csv_forms)
-    
-    with open(os.path.join(OUTPUT_DIR, "forms.jsonl"), "w", encoding="utf-8") as f:
-        for item in forms_data:
-            f.write(json.dumps(item, ensure_ascii=False) + "\n")
-    
-    # Save integrations
-    with open(os.path.join(OUTPUT_DIR, "integrations.jsonl"), "w", encoding="utf-8") as f:
-        for item in integrations:
-            f.write(json.dumps(item, ensure_ascii=False) + "\n")
-    
-    # Save API endpoints
-    with open(os.path.join(OUTPUT_DIR, "api_endpoints.jsonl"), "w", encoding="utf-8") as f:
-        for item in api_endpoints:
-            f.write(json.dumps(item, ensure_ascii=False) + "\n")
-    
-    # Save redirects
-    with open(os.path.join(OUTPUT_DIR, "redirects.csv"), "w", newline="", encoding="utf-8") as f:
-        fieldnames = ["from", "to", "http_status", "via"]
-        writer = csv.DictWriter(f, fieldnames=fieldnames)
-        writer.writeheader()
-        writer.writerows(redirect_map)
-    
-    # Save errors
-    with open(os.path.join(OUTPUT_DIR, "errors.csv"), "w", newline="", encoding="utf-8") as f:
-        fieldnames = ["url", "status", "referrer", "notes"]
-        writer = csv.DictWriter(f, fieldnames=fieldnames)
-        writer.writeheader()
-        writer.writerows(error_log)
-    
-    # Save sitemaps (empty file as placeholder)
-    with open(os.path.join(OUTPUT_DIR, "sitemaps.txt"), "w", encoding="utf-8") as f:
-        for sitemap in sitemaps_found:
-            f.write(sitemap + "\n")
-    
-    # Save hreflang map (empty file as placeholder)
-    with open(os.path.join(OUTPUT_DIR, "hreflang_map.jsonl"), "w", encoding="utf-8") as f:
-        for item in hreflang_map:
-            f.write(json.dumps(item, ensure_ascii=False) + "\n")
+        writer.writerows(rows)
+
+def write_sitemaps(path, sitemaps):
+    """Write the discovered sitemap URLs, one per line"""
+    with open(path, "w", encoding="utf-8") as f:
+        if sitemaps:
+            f.write("\n".join(sitemaps) + "\n")
+
+async def save_data(writers, paths):
+    """Save the in-memory crawl index and print the run summary"""
+    # The remaining files are independent, so write them from worker threads
+    # in parallel instead of blocking the event loop one after another
+    await asyncio.gather(
+        asyncio.to_thread(write_url_inventory, paths["urls.csv"], url_inventory),
+        # Save sitemaps (empty file as placeholder)
+        asyncio.to_thread(write_sitemaps, paths["sitemaps.txt"], sitemaps_found)
+    )
     
     # Print summary
-    page_count = len([u for u in url_inventory if u["type"] != "duplicate"])
-    article_count = len([u for u in url_inventory if u["type"] == "article"])
-    listing_count = len([u for u in url_inventory if u["type"] == "listing"])
-    static_count = len([u for u in url_inventory if u["type"] == "page"])
-    form_count = len(forms_data)
-    media_count = len(media_data)
-    redirect_count = len(redirect_map)
-    error_count = len(error_log)
-    api_count = len(api_endpoints)
+    page_count = len(url_inventory) - url_type_counts["duplicate"]
+    article_count = url_type_counts["article"]
+    listing_count = url_type_counts["listing"]
+    static_count = url_type_counts["page"]
+    form_count = writers.forms_jsonl.count
+    media_count = writers.media.count
+    redirect_count = writers.redirects.count
+    error_count = writers.errors.count
+    api_count = writers.api_endpoints.count
     
     print(f"DONE pages={page_count} articles={article_count} listings={listing_count} "
           f"static={static_count} forms={form_count} media={media_count} "
           f"redirects={redirect_count} errors={error_count} apis={api_count}")
 
 if __name__ == "__main__":
-    # Install required packages if needed
-    try:
-        import aiohttp
-        import bs4
-    except ImportError:
-        import subprocess
-        import sys
-        subprocess.check_call([sys.executable, "-m", "pip", "install", "aiohttp", "beautifulsoup4"])
-        import aiohttp
-        import bs4
-    
     # Start crawling
-    asyncio.run(crawl_website())
\ No newline at end of file
+    asyncio.run(crawl_website())